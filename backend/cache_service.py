@@ -0,0 +1,135 @@
+"""Response caching and conditional GET helpers.
+
+Payment reads are validated against a per-user change version stored on
+``users.payments_version`` / ``users.payments_updated_at``; every write that
+can change a user's payment responses must call ``bump_payments_version``
+in the same transaction. Sports are cached in-process as serialized JSON.
+"""
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Iterable
+from fastapi import Response
+from sqlalchemy import update
+from models import User, Sport
+from schemas import SportResponse
+from config import SPORTS_CACHE_TTL_SECONDS
+
+CACHE_CONTROL = "private, no-cache"
+
+_sports_lock = threading.Lock()
+_sports_cache = None  # (expires_at, etag, body)
+_sports_generation = 0
+
+
+# ── Conditional requests ─────────────────────────────────────
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def http_date(dt: Optional[datetime]) -> Optional[str]:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(
+    etag: str,
+    last_modified: Optional[datetime],
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (If-None-Match wins when present)."""
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(_weak(tag) == _weak(etag) for tag in candidates)
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        modified = int(last_modified.timestamp())
+        # Dates only carry whole seconds: until the second of the last change
+        # has passed, another write could land in it unseen, so don't 304
+        if modified >= int(time.time()):
+            return False
+        return modified <= int(since.timestamp())
+    return False
+
+
+def _weak(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+# ── Per-user payment versions ────────────────────────────────
+
+def bump_payments_version(db, user_ids: Iterable[int] = None):
+    """Invalidate cached payment responses of ``user_ids`` (all users if None).
+
+    Only issues the UPDATE; the caller commits it with the change it describes.
+    """
+    stmt = update(User).values(
+        payments_version=User.payments_version + 1,
+        payments_updated_at=datetime.now(timezone.utc),
+    )
+    if user_ids is not None:
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return
+        stmt = stmt.where(User.id.in_(user_ids))
+    db.execute(stmt)
+
+
+def payments_etag(user: User, *parts) -> str:
+    return make_etag("payments", user.id, user.payments_version, *parts)
+
+
+# ── Sports cache ─────────────────────────────────────────────
+
+def get_sports_json(db) -> tuple:
+    """Return ``(etag, body)`` for the sports list, rebuilding it when stale."""
+    global _sports_cache
+    cached = _sports_cache
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1], cached[2]
+
+    generation = _sports_generation
+    sports = db.query(Sport).order_by(Sport.name).all()
+    body = json.dumps(
+        [SportResponse.model_validate(s).model_dump(mode="json") for s in sports],
+        ensure_ascii=False,
+    ).encode("utf-8")
+    etag = f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+    with _sports_lock:
+        # Don't store a result that an invalidation raced past
+        if generation == _sports_generation:
+            _sports_cache = (time.monotonic() + SPORTS_CACHE_TTL_SECONDS, etag, body)
+    return etag, body
+
+
+def invalidate_sports():
+    """Drop the cached sports list; call after committing a sport change."""
+    global _sports_cache, _sports_generation
+    with _sports_lock:
+        _sports_cache = None
+        _sports_generation += 1
@@ -0,0 +1,78 @@
+import os
+import threading
+import logging
+from database import SessionLocal
+from models import Payment, PendingScreenshotDeletion
+from retention_service import compact_archive_bundles
+from config import UPLOAD_DIR, REAPER_INTERVAL_SECONDS, REAPER_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+_stop_event = threading.Event()
+_thread = None
+
+
+def reap_deleted_screenshots(batch_size: int = REAPER_BATCH_SIZE) -> int:
+    """Delete upload files queued in ``pending_screenshot_deletions``.
+
+    Deleting a payment queues its ``screenshot_path`` in the same
+    transaction, so only files of committed deletions are ever removed.
+    Returns the number of files removed.
+    """
+    removed = 0
+    db = SessionLocal()
+    try:
+        while True:
+            pending = (
+                db.query(PendingScreenshotDeletion)
+                .order_by(PendingScreenshotDeletion.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not pending:
+                break
+            paths = {row.screenshot_path for row in pending}
+            still_used = {
+                path for (path,) in db.query(Payment.screenshot_path).filter(Payment.screenshot_path.in_(paths))
+            }
+            for path in paths - still_used:
+                try:
+                    os.remove(os.path.join(UPLOAD_DIR, os.path.basename(path)))
+                    removed += 1
+                except FileNotFoundError:
+                    pass  # already archived or removed by another worker
+            db.query(PendingScreenshotDeletion).filter(
+                PendingScreenshotDeletion.id.in_([row.id for row in pending])
+            ).delete(synchronize_session=False)
+            db.commit()
+    finally:
+        db.close()
+    if removed:
+        logger.info(f"Reaped {removed} screenshot(s) of deleted payments")
+    return removed
+
+
+def _run(interval: int):
+    while not _stop_event.wait(interval):
+        try:
+            reap_deleted_screenshots()
+            compact_archive_bundles()
+        except Exception as e:
+            logger.error(f"Screenshot reaper failed: {e}")
+
+
+def start_reaper(interval: int = REAPER_INTERVAL_SECONDS):
+    """Start the background reaper thread (no-op if disabled or already running)."""
+    global _thread
+    if interval <= 0:
+        return
+    if _thread is not None and _thread.is_alive():
+        return
+    _stop_event.clear()
+    _thread = threading.Thread(target=_run, args=(interval,), name="screenshot-reaper", daemon=True)
+    _thread.start()
+
+
+def stop_reaper():
+    """Signal the background reaper thread to exit."""
+    _stop_event.set()
@@ -5,13 +5,42 @@ load_dotenv()
 
 # Base directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(BASE_DIR, "uploads"))
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(BASE_DIR, "archive"))
+os.makedirs(ARCHIVE_DIR, exist_ok=True)
 
 # Database
-DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'payment_extractor.db')}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'payment_extractor.db')}")
 
 # JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-key-for-development-only")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
+
+# Screenshot reaper – removes upload files of deleted payments in the background
+REAPER_INTERVAL_SECONDS = int(os.getenv("REAPER_INTERVAL_SECONDS", "300"))
+REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", "500"))
+
+# Retention – screenshots and raw OCR text of payments older than this move to cold storage
+RETENTION_AGE_DAYS = int(os.getenv("RETENTION_AGE_DAYS", "90"))
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+
+# OCR backend – "tesseract" (default) or "fake" for load testing without Tesseract
+OCR_BACKEND = os.getenv("OCR_BACKEND", "tesseract")
+FAKE_OCR_LATENCY_MS = float(os.getenv("FAKE_OCR_LATENCY_MS", "0"))
+FAKE_OCR_JITTER_MS = float(os.getenv("FAKE_OCR_JITTER_MS", "0"))
+
+# Profiling – off unless PROFILING_ENABLED; then requests with "X-Profile: <PROFILE_TOKEN>"
+# or a random PROFILE_SAMPLE_RATE fraction are profiled into PROFILE_DIR
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "1000"))  # oldest profiles are pruned beyond this
+
+# Sports list cache lifetime; writes in this process invalidate it immediately,
+# the TTL bounds staleness across workers
+SPORTS_CACHE_TTL_SECONDS = float(os.getenv("SPORTS_CACHE_TTL_SECONDS", "60"))
@@ -0,0 +1,45 @@
+"""Deterministic stand-in for ``ocr_service.extract_payment_details``.
+
+Selected with ``OCR_BACKEND=fake`` so load tests can measure the API and
+database without Tesseract. The same file contents always produce the same
+result; latency is ``FAKE_OCR_LATENCY_MS`` plus up to ``FAKE_OCR_JITTER_MS``.
+"""
+import time
+import random
+import hashlib
+from config import FAKE_OCR_LATENCY_MS, FAKE_OCR_JITTER_MS
+
+_NAMES = ["Aarav Sharma", "Priya Patel", "Rohan Mehta", "Ananya Iyer", "Vikram Singh", "Sneha Reddy"]
+
+
+def extract_payment_details(image_path: str) -> dict:
+    try:
+        with open(image_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).digest()
+    except OSError as e:
+        return {"raw_text": "", "extracted": {}, "error": str(e)}
+
+    rng = random.Random(digest)
+    time.sleep((FAKE_OCR_LATENCY_MS + rng.uniform(0, FAKE_OCR_JITTER_MS)) / 1000)
+
+    receiver = rng.choice(_NAMES)
+    sender = rng.choice(_NAMES)
+    extracted = {
+        "amount": float(rng.randint(10, 5000)),
+        "transaction_id": "T" + "".join(str(rng.randint(0, 9)) for _ in range(20)),
+        "upi_id": receiver.split()[0].lower() + "@okaxis",
+        "receiver_name": receiver,
+        "sender_name": sender,
+        "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2026",
+        "status": rng.choice(["Success", "Success", "Success", "Failed"]),
+    }
+    raw_text = "\n".join([
+        f"Payment {extracted['status']}",
+        f"Paid to {receiver}",
+        f"UPI ID: {extracted['upi_id']}",
+        f"Rs {extracted['amount']:.2f}",
+        f"Transaction ID: {extracted['transaction_id']}",
+        f"Debited from {sender}",
+        f"Date: {extracted['date']}",
+    ])
+    return {"raw_text": raw_text, "extracted": extracted}
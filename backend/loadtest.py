@@ -0,0 +1,275 @@
+"""End-to-end load test for the Payment Details Extractor API.
+
+Starts a throwaway uvicorn instance (fresh SQLite database and upload
+directory, fake OCR backend) unless ``--base-url`` points at a running
+server, then drives the register, login, upload, list, search and stats
+flows from ``--users`` concurrent virtual users.
+
+    python loadtest.py --users 20 --iterations 25 --ocr-latency-ms 300
+    python loadtest.py --duration 60 --compare loadtest_results/previous.json
+
+Per-endpoint throughput, latency percentiles and error rates are printed
+and saved as JSON under ``loadtest_results/`` for comparison between runs.
+Only the standard library is used so the harness runs anywhere the API does.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+from urllib.parse import urlsplit, urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, "loadtest_results")
+
+# Smallest valid PNG; a per-upload suffix after IEND keeps files distinct
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d4944415478da63f8ffff3f0005fe02fea7d6a4a80000000049454e44ae426082"
+)
+_SEARCH_TERMS = ["Sharma", "Patel", "okaxis", "T1", "Priya", "Singh"]
+
+
+class Recorder:
+    """Thread-safe collection of (latency, ok) samples per endpoint label."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, label: str, seconds: float, ok: bool):
+        with self._lock:
+            self.samples.setdefault(label, []).append((seconds, ok))
+
+    def summary(self, wall_seconds: float) -> dict:
+        report = {}
+        for label, samples in sorted(self.samples.items()):
+            latencies = sorted(s for s, _ in samples)
+            errors = sum(1 for _, ok in samples if not ok)
+            report[label] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": errors / len(samples),
+                "throughput_rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+                "mean_ms": sum(latencies) / len(latencies) * 1000,
+                "p50_ms": _percentile(latencies, 50),
+                "p90_ms": _percentile(latencies, 90),
+                "p95_ms": _percentile(latencies, 95),
+                "p99_ms": _percentile(latencies, 99),
+                "max_ms": latencies[-1] * 1000,
+            }
+        return report
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return (sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)) * 1000
+
+
+class Client:
+    """One keep-alive HTTP connection per virtual user."""
+
+    def __init__(self, base_url: str, recorder: Recorder, timeout: float):
+        parts = urlsplit(base_url)
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._conn = conn_cls(parts.hostname, parts.port, timeout=timeout)
+        self._prefix = parts.path.rstrip("/")
+        self._recorder = recorder
+        self.token = None
+
+    def request(self, label: str, method: str, path: str, body: bytes = None, headers: dict = None):
+        headers = dict(headers or {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        started = time.perf_counter()
+        status, payload = 0, None
+        try:
+            self._conn.request(method, self._prefix + path, body=body, headers=headers)
+            resp = self._conn.getresponse()
+            status, raw = resp.status, resp.read()
+            payload = json.loads(raw) if raw else None
+        except (OSError, http.client.HTTPException, ValueError):
+            self._conn.close()
+        self._recorder.add(label, time.perf_counter() - started, 200 <= status < 400)
+        return status, payload
+
+    def json(self, label: str, method: str, path: str, data: dict):
+        return self.request(label, method, path, json.dumps(data).encode(), {"Content-Type": "application/json"})
+
+    def upload(self, content: bytes, sport_id: int = None):
+        boundary = uuid.uuid4().hex
+        parts = [
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"shot.png\"\r\n"
+            f"Content-Type: image/png\r\n\r\n".encode() + content + b"\r\n"
+        ]
+        if sport_id is not None:
+            parts.append(f"--{boundary}\r\nContent-Disposition: form-data; name=\"sport_id\"\r\n\r\n{sport_id}\r\n".encode())
+        body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+        return self.request("upload", "POST", "/api/payments/upload", body,
+                            {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+    def close(self):
+        self._conn.close()
+
+
+def virtual_user(base_url: str, recorder: Recorder, args, deadline: float, user_no: int):
+    client = Client(base_url, recorder, args.timeout)
+    username = f"lt_{uuid.uuid4().hex[:10]}"
+    password = "loadtest-pass"
+    try:
+        status, _ = client.json("register", "POST", "/api/auth/register",
+                                {"username": username, "email": f"{username}@example.com", "password": password})
+        status, data = client.json("login", "POST", "/api/auth/login", {"username": username, "password": password})
+        if status != 200:
+            return
+        client.token = data["access_token"]
+
+        _, sports = client.request("stats:sports", "GET", "/api/sports")
+        sport_ids = [s["id"] for s in sports or []] or [None]
+
+        i = 0
+        while (time.monotonic() < deadline) if args.duration else (i < args.iterations):
+            content = _PNG + f"{user_no}:{i}:{uuid.uuid4().hex}".encode()
+            client.upload(content, sport_ids[i % len(sport_ids)])
+            client.request("list", "GET", "/api/payments")
+            term = _SEARCH_TERMS[(user_no + i) % len(_SEARCH_TERMS)]
+            client.request("search", "GET", "/api/payments?" + urlencode({"search": term}))
+            # Dashboard stats cards are computed client-side from sports + the full list
+            client.request("stats:sports", "GET", "/api/sports")
+            client.request("stats:payments", "GET", "/api/payments")
+            i += 1
+    finally:
+        client.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(args, workdir: str):
+    """Migrate a scratch database and boot uvicorn against it with fake OCR."""
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        UPLOAD_DIR=os.path.join(workdir, "uploads"),
+        ARCHIVE_DIR=os.path.join(workdir, "archive"),
+        OCR_BACKEND="fake",
+        FAKE_OCR_LATENCY_MS=str(args.ocr_latency_ms),
+        FAKE_OCR_JITTER_MS=str(args.ocr_jitter_ms),
+    )
+    subprocess.run([sys.executable, "migrations.py"], cwd=BASE_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    port = args.port or _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BASE_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    while time.monotonic() - started < 30:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc, base_url
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not become ready within 30 s")
+
+
+def print_report(report: dict, previous: dict = None):
+    header = f"{'endpoint':<16}{'reqs':>7}{'err%':>7}{'rps':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for label, r in report.items():
+        print(f"{label:<16}{r['requests']:>7}{r['error_rate'] * 100:>6.1f}%{r['throughput_rps']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+        prev = (previous or {}).get(label)
+        if prev:
+            print(f"{'  vs previous':<16}{'':>7}{(r['error_rate'] - prev['error_rate']) * 100:>+6.1f}%"
+                  f"{r['throughput_rps'] - prev['throughput_rps']:>+9.1f}"
+                  + "".join(f"{r[k] - prev[k]:>+9.1f}" for k in ("p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")))
+    print("(latencies in ms)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--base-url", help="Target a running server instead of starting a local one")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=20, help="Upload/list/search/stats rounds per user")
+    parser.add_argument("--duration", type=float, default=0, help="Run for this many seconds instead of --iterations")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--port", type=int, default=0, help="Port for the local server (default: random)")
+    parser.add_argument("--ocr-latency-ms", type=float, default=0, help="Fake OCR latency per upload")
+    parser.add_argument("--ocr-jitter-ms", type=float, default=0, help="Extra random fake OCR latency")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Results file (default: loadtest_results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results file to diff against")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.TemporaryDirectory(prefix="loadtest-")
+    proc = None
+    try:
+        if args.base_url:
+            base_url = args.base_url
+        else:
+            proc, base_url = start_local_server(args, workdir.name)
+
+        recorder = Recorder()
+        started_at = datetime.now()
+        deadline = time.monotonic() + args.duration
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            futures = [pool.submit(virtual_user, base_url, recorder, args, deadline, n) for n in range(args.users)]
+            for f in futures:
+                f.result()
+        wall = time.perf_counter() - started
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        workdir.cleanup()
+
+    report = recorder.summary(wall)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["endpoints"]
+    print_report(report, previous)
+
+    total = sum(r["requests"] for r in report.values())
+    print(f"\n{total} requests in {wall:.1f} s ({total / wall:.1f} req/s) from {args.users} users")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{started_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "wall_seconds": wall,
+            "endpoints": report,
+        }, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
+import time
+
+_import_started = time.perf_counter()
+
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from database import engine, Base
-from models import Sport
-from database import SessionLocal
 from routes import auth_routes, payment_routes, sport_routes
-from config import UPLOAD_DIR
+from config import UPLOAD_DIR, PROFILING_ENABLED
+from database import engine
+from cleanup_service import start_reaper, stop_reaper
+from retention_service import ArchivedStaticFiles, start_retention, stop_retention
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Schema is managed by migrations.py, run as a separate step before boot.
 
 app = FastAPI(
     title="Payment Details Extractor API",
@@ -25,35 +31,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Serve uploaded screenshots
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+# Serve uploaded screenshots (archived ones are read back from their bundle)
+app.mount("/uploads", ArchivedStaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 # Register route modules
 app.include_router(auth_routes.router)
 app.include_router(payment_routes.router)
 app.include_router(sport_routes.router)
 
+# Opt-in request profiling; nothing is attached when disabled
+if PROFILING_ENABLED:
+    import profiling_service
+    profiling_service.install(app, engine)
+
+
+@app.on_event("startup")
+def start_screenshot_reaper():
+    """Start the background job that removes screenshots of deleted payments."""
+    start_reaper()
+
+
+@app.on_event("shutdown")
+def stop_screenshot_reaper():
+    stop_reaper()
+
+
+@app.on_event("startup")
+def start_retention_job():
+    """Start the background job that moves old payments to cold storage."""
+    start_retention()
+
+
+@app.on_event("shutdown")
+def stop_retention_job():
+    stop_retention()
+
 
 @app.on_event("startup")
-def seed_sports():
-    """Seed default sports categories on first run."""
-    db = SessionLocal()
-    try:
-        if db.query(Sport).count() == 0:
-            defaults = [
-                Sport(name="Cricket", icon="🏏", description="Cricket match fees and tournament payments"),
-                Sport(name="Football", icon="⚽", description="Football league and match payments"),
-                Sport(name="Badminton", icon="🏸", description="Badminton court and tournament fees"),
-                Sport(name="Tennis", icon="🎾", description="Tennis coaching and match payments"),
-                Sport(name="Basketball", icon="🏀", description="Basketball league payments"),
-                Sport(name="Swimming", icon="🏊", description="Swimming pool and coaching fees"),
-                Sport(name="Gym", icon="🏋️", description="Gym membership and trainer payments"),
-                Sport(name="Other", icon="🏆", description="Other sports and miscellaneous payments"),
-            ]
-            db.add_all(defaults)
-            db.commit()
-    finally:
-        db.close()
+def log_startup_time():
+    """Record how long the process took from importing main to serving."""
+    app.state.startup_ms = (time.perf_counter() - _import_started) * 1000
+    logger.info(f"Startup completed in {app.state.startup_ms:.1f} ms")
 
 
 @app.get("/")
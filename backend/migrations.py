@@ -0,0 +1,204 @@
+"""Versioned schema migrations.
+
+Run as a separate deploy step before starting the API:
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # show applied / pending versions
+
+Each migration runs in its own transaction (unless marked
+``transactional = False``, e.g. for VACUUM) and is recorded in the
+``schema_migrations`` table. Append new migrations to ``MIGRATIONS``;
+never edit or reorder ones that have already shipped.
+"""
+import sys
+import time
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import (
+    Column, Integer, String, Float, Text, LargeBinary, DateTime, ForeignKey, MetaData, Table, Index, select, text,
+)
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Each migration declares the exact tables it creates on its own MetaData
+# instead of using models.py, so what a shipped version does never changes.
+
+
+def _create_core_tables(conn):
+    meta = MetaData()
+    Table(
+        "users", meta,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("username", String(50), unique=True, nullable=False, index=True),
+        Column("email", String(100), unique=True, nullable=False, index=True),
+        Column("password_hash", String(255), nullable=False),
+        Column("created_at", DateTime),
+    )
+    Table(
+        "sports", meta,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String(50), unique=True, nullable=False),
+        Column("icon", String(10)),
+        Column("description", String(200)),
+        Column("created_at", DateTime),
+    )
+    Table(
+        "payments", meta,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("sport_id", Integer, ForeignKey("sports.id"), nullable=True),
+        Column("transaction_id", String(100)),
+        Column("amount", Float),
+        Column("sender_name", String(100)),
+        Column("receiver_name", String(100)),
+        Column("date", String(50)),
+        Column("status", String(20)),
+        Column("upi_id", String(100)),
+        Column("screenshot_path", String(255), nullable=False),
+        Column("raw_ocr_text", Text),
+        Column("created_at", DateTime),
+    )
+    # checkfirst lets databases created before migrations existed adopt version 1
+    meta.create_all(conn, checkfirst=True)
+
+
+def _create_payment_archives(conn):
+    meta = MetaData()
+    Table("payments", meta, Column("id", Integer, primary_key=True))  # FK target only
+    payment_archives = Table(
+        "payment_archives", meta,
+        Column("payment_id", Integer, ForeignKey("payments.id"), primary_key=True),
+        Column("raw_ocr_text", LargeBinary),
+        Column("screenshot_bundle", String(255)),
+        Column("archived_at", DateTime),
+    )
+    # Databases from before migrations existed may already have it (create_all at boot)
+    payment_archives.create(conn, checkfirst=True)
+
+
+def _seed_sports(conn):
+    sports = Table(
+        "sports", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("name", String(50)),
+        Column("icon", String(10)),
+        Column("description", String(200)),
+        Column("created_at", DateTime),
+    )
+    if conn.execute(select(sports.c.id).limit(1)).first() is not None:
+        return
+    now = datetime.now(timezone.utc)
+    conn.execute(sports.insert(), [
+        {"name": name, "icon": icon, "description": description, "created_at": now}
+        for name, icon, description in [
+            ("Cricket", "🏏", "Cricket match fees and tournament payments"),
+            ("Football", "⚽", "Football league and match payments"),
+            ("Badminton", "🏸", "Badminton court and tournament fees"),
+            ("Tennis", "🎾", "Tennis coaching and match payments"),
+            ("Basketball", "🏀", "Basketball league payments"),
+            ("Swimming", "🏊", "Swimming pool and coaching fees"),
+            ("Gym", "🏋️", "Gym membership and trainer payments"),
+            ("Other", "🏆", "Other sports and miscellaneous payments"),
+        ]
+    ])
+
+
+def _add_user_payments_version(conn):
+    conn.execute(text("ALTER TABLE users ADD COLUMN payments_version INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(text("ALTER TABLE users ADD COLUMN payments_updated_at DATETIME"))
+    conn.execute(text("UPDATE users SET payments_updated_at = CURRENT_TIMESTAMP"))
+
+
+def _enable_incremental_vacuum(conn):
+    # auto_vacuum only takes effect after a full VACUUM; from then on
+    # retention returns freed pages to the OS with PRAGMA incremental_vacuum
+    if conn.dialect.name != "sqlite":
+        return
+    conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.exec_driver_sql("VACUUM")
+
+
+_enable_incremental_vacuum.transactional = False  # VACUUM can't run in a transaction
+
+
+def _create_pending_screenshot_deletions(conn):
+    meta = MetaData()
+    Table(
+        "pending_screenshot_deletions", meta,
+        Column("id", Integer, primary_key=True),
+        Column("screenshot_path", String(255), nullable=False),
+    ).create(conn)
+
+
+def _index_payment_screenshot_path(conn):
+    # /uploads/<file> looks archived screenshots up by file name
+    payments = Table("payments", MetaData(), Column("screenshot_path", String(255)))
+    Index("ix_payments_screenshot_path", payments.c.screenshot_path).create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "create users, sports and payments", _create_core_tables),
+    (2, "create payment_archives", _create_payment_archives),
+    (3, "seed default sports", _seed_sports),
+    (4, "add users.payments_version", _add_user_payments_version),
+    (5, "enable incremental auto_vacuum", _enable_incremental_vacuum),
+    (6, "create pending_screenshot_deletions", _create_pending_screenshot_deletions),
+    (7, "index payments.screenshot_path", _index_payment_screenshot_path),
+]
+
+
+def applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations() -> list:
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def _record(conn, version: int, name: str):
+    conn.execute(schema_migrations.insert().values(
+        version=version, name=name, applied_at=datetime.now(timezone.utc),
+    ))
+
+
+def migrate() -> int:
+    """Apply all pending migrations in order. Returns how many were applied."""
+    count = 0
+    for version, name, upgrade in pending_migrations():
+        started = time.perf_counter()
+        if getattr(upgrade, "transactional", True):
+            with engine.begin() as conn:
+                upgrade(conn)
+                _record(conn, version, name)
+        else:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                upgrade(conn)
+            with engine.begin() as conn:
+                _record(conn, version, name)
+        logger.info(f"Applied migration {version} ({name}) in {(time.perf_counter() - started) * 1000:.1f} ms")
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--status" in sys.argv[1:]:
+        pending = {m[0] for m in pending_migrations()}
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:>4}  {'pending' if version in pending else 'applied'}  {name}")
+    else:
+        applied = migrate()
+        print(f"{applied} migration(s) applied" if applied else "Database is up to date")
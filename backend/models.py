@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from database import Base
@@ -12,6 +12,9 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Bumped on every change to the user's payments; drives ETag / Last-Modified
+    payments_version = Column(Integer, nullable=False, default=0, server_default="0")
+    payments_updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan")
 
@@ -41,9 +44,32 @@ class Payment(Base):
     date = Column(String(50), nullable=True)
     status = Column(String(20), default="Completed")
     upi_id = Column(String(100), nullable=True)
-    screenshot_path = Column(String(255), nullable=False)
+    screenshot_path = Column(String(255), nullable=False, index=True)  # archived-image lookups
     raw_ocr_text = Column(Text, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     user = relationship("User", back_populates="payments")
     sport = relationship("Sport", back_populates="payments")
+    archive = relationship("PaymentArchive", back_populates="payment", uselist=False, cascade="all, delete-orphan")
+
+
+class PaymentArchive(Base):
+    """Cold storage for a payment's raw OCR text and screenshot location."""
+
+    __tablename__ = "payment_archives"
+
+    payment_id = Column(Integer, ForeignKey("payments.id"), primary_key=True)
+    raw_ocr_text = Column(LargeBinary, nullable=True)  # zlib-compressed UTF-8
+    screenshot_bundle = Column(String(255), nullable=True)  # zip file name in ARCHIVE_DIR
+    archived_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    payment = relationship("Payment", back_populates="archive")
+
+
+class PendingScreenshotDeletion(Base):
+    """Upload file of a deleted payment, queued for the background reaper."""
+
+    __tablename__ = "pending_screenshot_deletions"
+
+    id = Column(Integer, primary_key=True)
+    screenshot_path = Column(String(255), nullable=False)
@@ -1,13 +1,16 @@
 import re
-import pytesseract
-from PIL import Image, ImageOps, ImageEnhance
 import logging
+from typing import TYPE_CHECKING
+
+# pytesseract and Pillow are imported on first use so processes that never
+# run OCR (migrations, workers serving reads) don't pay for loading them.
+if TYPE_CHECKING:
+    from PIL import Image
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def preprocess_image(image_path: str) -> Image:
+def preprocess_image(image_path: str) -> "Image.Image":
+    from PIL import Image, ImageOps, ImageEnhance
     img = Image.open(image_path).convert('RGB')
     img = ImageEnhance.Contrast(img).enhance(2.0)
     img = ImageEnhance.Sharpness(img).enhance(2.0)
@@ -17,6 +20,8 @@ def preprocess_image(image_path: str) -> Image:
 
 def extract_payment_details(image_path: str) -> dict:
     try:
+        import pytesseract
+        from PIL import Image
         original_img = Image.open(image_path)
         raw_text = pytesseract.image_to_string(original_img)
         
@@ -0,0 +1,292 @@
+"""Opt-in per-request profiling.
+
+Nothing in this module is wired up unless ``PROFILING_ENABLED`` is set, so a
+disabled deployment pays no per-request cost. When enabled, a request is
+profiled if it carries ``X-Profile: <PROFILE_TOKEN>`` or is picked at random
+with probability ``PROFILE_SAMPLE_RATE``. For a profiled request we record:
+
+- a sampled Python stack profile of the threads while they run work of this
+  request (sync endpoints, SQL statements, OCR), written as collapsed stacks
+  (``.folded``) for flamegraph.pl / speedscope,
+- per-statement SQL counts and timings,
+- time spent in OCR and in the Tesseract subprocess,
+
+and write them to ``PROFILE_DIR``, keeping at most ``PROFILE_MAX_FILES``
+files (oldest profiles are pruned). The profile id is returned in the
+``X-Profile-Id`` response header.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import hmac
+import threading
+import functools
+import asyncio
+import contextvars
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import event
+from config import (
+    BASE_DIR,
+    PROFILE_DIR,
+    PROFILE_TOKEN,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_INTERVAL_MS,
+    PROFILE_MAX_FILES,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+_IDLE_FILES = {"threading.py", "queue.py", "selectors.py"}
+
+_current = contextvars.ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """Everything captured for one profiled request."""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.active = Counter()  # thread id -> nesting depth of this request's work
+        self.stacks = Counter()
+        self.samples = 0
+        self.sql = {}
+        self.spans = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id}", daemon=True)
+
+    def enter_thread(self):
+        with self._lock:
+            self.active[threading.get_ident()] += 1
+
+    def exit_thread(self):
+        tid = threading.get_ident()
+        with self._lock:
+            self.active[tid] -= 1
+            if self.active[tid] <= 0:
+                del self.active[tid]
+
+    @contextmanager
+    def on_thread(self):
+        """Attribute samples of the current thread to this request while inside."""
+        self.enter_thread()
+        try:
+            yield
+        finally:
+            self.exit_thread()
+
+    def add_span(self, name: str, seconds: float):
+        with self._lock:
+            count, total = self.spans.get(name, (0, 0.0))
+            self.spans[name] = (count + 1, total + seconds)
+
+    def add_sql(self, statement: str, seconds: float):
+        key = " ".join(statement.split())
+        with self._lock:
+            count, total = self.sql.get(key, (0, 0.0))
+            self.sql[key] = (count + 1, total + seconds)
+
+    def start(self):
+        self._sampler.start()
+
+    def _sample(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        own = threading.get_ident()
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self.active)
+            for tid in threads:
+                frame = frames.get(tid)
+                if frame is None or tid == own:
+                    continue
+                idle = os.path.basename(frame.f_code.co_filename) in _IDLE_FILES
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    idle = idle and not code.co_filename.startswith(BASE_DIR)
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # Skip threads parked between tasks (pool workers, the idle event loop)
+                if not idle:
+                    self.stacks[f"thread-{tid};" + ";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def finish(self, status_code: int, elapsed: float):
+        """Stop sampling and write the profile (blocking; run off the event loop)."""
+        self._stop.set()
+        self._sampler.join()
+
+        # The request path only goes in the JSON; file names must stay short and safe
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        base = os.path.join(PROFILE_DIR, f"{stamp}-{self.id}")
+        with open(base + ".folded", "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(base + ".json", "w") as f:
+            json.dump({
+                "id": self.id,
+                "method": self.method,
+                "path": self.path,
+                "status_code": status_code,
+                "duration_ms": elapsed * 1000,
+                "samples": self.samples,
+                "sample_interval_ms": PROFILE_INTERVAL_MS,
+                "stack_coverage": "sync endpoint bodies, SQL statements and OCR calls of this request; "
+                                  "async endpoint code between those is not sampled",
+                "spans": {
+                    name: {"count": count, "total_ms": total * 1000}
+                    for name, (count, total) in self.spans.items()
+                },
+                "sql": {
+                    "count": sum(count for count, _ in self.sql.values()),
+                    "total_ms": sum(total for _, total in self.sql.values()) * 1000,
+                    "statements": sorted(
+                        ({"statement": s, "count": c, "total_ms": t * 1000} for s, (c, t) in self.sql.items()),
+                        key=lambda r: r["total_ms"],
+                        reverse=True,
+                    ),
+                },
+            }, f, indent=2)
+        logger.info(f"Profiled {self.method} {self.path} in {elapsed * 1000:.1f} ms -> {base}.json")
+        _prune_profiles()
+
+
+def _prune_profiles(max_files: int = PROFILE_MAX_FILES):
+    """Delete the oldest profiles so PROFILE_DIR holds at most ``max_files`` files."""
+    # Names start with a UTC timestamp, so sorting them sorts by age; each
+    # profile is a .folded/.json pair
+    stems = sorted({
+        os.path.splitext(n)[0] for n in os.listdir(PROFILE_DIR) if n.endswith((".folded", ".json"))
+    })
+    for stem in stems[:max(0, len(stems) - max_files // 2)]:
+        for ext in (".folded", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, stem + ext))
+            except FileNotFoundError:
+                pass  # pruned concurrently by another worker
+
+
+def _should_profile(request: Request) -> bool:
+    token = request.headers.get(PROFILE_HEADER)
+    if token is not None and PROFILE_TOKEN and hmac.compare_digest(token, PROFILE_TOKEN):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+async def profile_middleware(request: Request, call_next):
+    if not _should_profile(request):
+        return await call_next(request)
+
+    session = ProfileSession(request.method, request.url.path)
+    token = _current.set(session)
+    session.start()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Profile-Id"] = session.id
+        return response
+    finally:
+        _current.reset(token)
+        elapsed = time.perf_counter() - session.started
+        # Profiling must never fail or stall the request it observes
+        try:
+            await run_in_threadpool(session.finish, status_code, elapsed)
+        except Exception:
+            logger.exception(f"Failed to write profile {session.id}")
+
+
+def timed(span: str):
+    """Decorator recording the wrapped call's duration on the active profile."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            session = _current.get()
+            if session is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                with session.on_thread():
+                    return fn(*args, **kwargs)
+            finally:
+                session.add_span(span, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    session = _current.get()
+    if session is not None:
+        session.enter_thread()
+        context._profile_session = session
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    session = getattr(context, "_profile_session", None)
+    if session is not None:
+        session.add_sql(statement, time.perf_counter() - context._profile_started)
+        session.exit_thread()
+        context._profile_session = None
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    session = getattr(context, "_profile_session", None)
+    if session is not None:
+        session.exit_thread()
+        context._profile_session = None
+
+
+def _profile_sync_endpoint(call):
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        session = _current.get()
+        if session is None:
+            return call(*args, **kwargs)
+        with session.on_thread():
+            return call(*args, **kwargs)
+    return wrapper
+
+
+def install(app, engine):
+    """Attach the profiling middleware, SQL listeners and Tesseract timer.
+
+    Call after all routers are included so their endpoints get wrapped.
+    """
+    if not PROFILE_TOKEN and PROFILE_SAMPLE_RATE <= 0:
+        logger.warning("Profiling enabled but neither PROFILE_TOKEN nor PROFILE_SAMPLE_RATE is set")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    app.middleware("http")(profile_middleware)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    # Sync endpoints run alone on a threadpool worker, so that thread can be
+    # sampled for exactly as long as the endpoint runs. Async endpoints share
+    # the event loop with other requests and are only covered by SQL/OCR hooks.
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not asyncio.iscoroutinefunction(route.dependant.call):
+            route.dependant.call = _profile_sync_endpoint(route.dependant.call)
+
+    # Time the Tesseract subprocess itself; pytesseract looks run_tesseract up
+    # at call time, so replacing the module attribute is enough.
+    try:
+        from pytesseract import pytesseract as tesseract_module
+    except ImportError:
+        return
+    tesseract_module.run_tesseract = timed("tesseract_subprocess")(tesseract_module.run_tesseract)
@@ -0,0 +1,334 @@
+import os
+import zlib
+import uuid
+import zipfile
+import mimetypes
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from database import SessionLocal, engine
+from models import Payment, PaymentArchive
+from cache_service import bump_payments_version
+from config import (
+    UPLOAD_DIR,
+    ARCHIVE_DIR,
+    RETENTION_AGE_DAYS,
+    RETENTION_INTERVAL_SECONDS,
+    RETENTION_BATCH_SIZE,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_LOCK_PATH = os.path.join(ARCHIVE_DIR, ".archive.lock")
+
+_stop_event = threading.Event()
+_thread = None
+
+
+def compress_text(text: Optional[str]) -> Optional[bytes]:
+    if text is None:
+        return None
+    return zlib.compress(text.encode("utf-8"), 9)
+
+
+def decompress_text(blob: Optional[bytes]) -> Optional[str]:
+    if blob is None:
+        return None
+    return zlib.decompress(blob).decode("utf-8")
+
+
+@contextmanager
+def archive_lock():
+    """Cross-process lock around anything that writes or rewrites bundles.
+
+    Every uvicorn worker runs the background jobs; the lock file makes sure
+    only one of them touches ``ARCHIVE_DIR`` at a time. Yields False (without
+    waiting) if another process holds it.
+    """
+    with open(ARCHIVE_LOCK_PATH, "a+") as f:
+        f.seek(0)
+        try:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            acquired = True
+        except OSError:
+            acquired = False
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def load_archived_ocr_text(db, payment_id: int) -> Optional[str]:
+    """Fetch and decompress the archived raw OCR text of a payment, if any."""
+    row = db.query(PaymentArchive.raw_ocr_text).filter(PaymentArchive.payment_id == payment_id).first()
+    return decompress_text(row[0]) if row else None
+
+
+def read_archived_screenshot(filename: str) -> Optional[bytes]:
+    """Return the bytes of an archived screenshot, or None if it isn't archived."""
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(PaymentArchive.screenshot_bundle)
+            .join(Payment, Payment.id == PaymentArchive.payment_id)
+            .filter(Payment.screenshot_path == filename, PaymentArchive.screenshot_bundle.isnot(None))
+            .first()
+        )
+    finally:
+        db.close()
+    if not row:
+        return None
+    try:
+        with zipfile.ZipFile(os.path.join(ARCHIVE_DIR, row[0])) as bundle:
+            return bundle.read(filename)
+    except (FileNotFoundError, KeyError):
+        logger.error(f"Archived screenshot {filename} missing from bundle {row[0]}")
+        return None
+
+
+class ArchivedStaticFiles(StaticFiles):
+    """Serve uploads from disk, falling back to the archive bundles."""
+
+    async def get_response(self, path: str, scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            if e.status_code != 404 or os.path.basename(path) != path:
+                raise
+        # DB lookup + zip read are blocking; keep them off the event loop
+        content = await run_in_threadpool(read_archived_screenshot, path)
+        if content is None:
+            raise HTTPException(status_code=404)
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return Response(content, media_type=media_type)
+
+
+def archive_old_payments(
+    age_days: int = RETENTION_AGE_DAYS,
+    batch_size: int = RETENTION_BATCH_SIZE,
+) -> int:
+    """Move one batch of old screenshots and raw OCR text to cold storage.
+
+    Screenshots are written to a new deflate-compressed zip bundle in
+    ``ARCHIVE_DIR`` and raw OCR text to the ``payment_archives`` side table.
+    Original files are only removed once the archive rows are committed, and
+    the bundle is removed again if the commit fails. Callers must hold
+    ``archive_lock``. Returns the number of payments archived.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=age_days)
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Payment.id, Payment.user_id, Payment.screenshot_path, Payment.raw_ocr_text)
+            .outerjoin(PaymentArchive, PaymentArchive.payment_id == Payment.id)
+            .filter(Payment.created_at < cutoff, PaymentArchive.payment_id.is_(None))
+            .order_by(Payment.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return 0
+
+        bundle_name = f"screenshots-{datetime.now(timezone.utc):%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.zip"
+        bundle_path = os.path.join(ARCHIVE_DIR, bundle_name)
+        tmp_path = bundle_path + ".tmp"
+        bundled = set()
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as bundle:
+            for _, _, screenshot_path, _ in rows:
+                filepath = os.path.join(UPLOAD_DIR, screenshot_path)
+                if os.path.isfile(filepath):
+                    bundle.write(filepath, arcname=screenshot_path)
+                    bundled.add(screenshot_path)
+        if bundled:
+            os.replace(tmp_path, bundle_path)
+        else:
+            os.remove(tmp_path)
+
+        try:
+            ids = [r[0] for r in rows]
+            # The UPDATE takes SQLite's write lock first, so the re-check below
+            # cannot race a payment being deleted before the archive rows land.
+            db.query(Payment).filter(Payment.id.in_(ids)).update(
+                {Payment.raw_ocr_text: None}, synchronize_session=False
+            )
+            live = {
+                payment_id
+                for (payment_id,) in db.query(Payment.id)
+                .outerjoin(PaymentArchive, PaymentArchive.payment_id == Payment.id)
+                .filter(Payment.id.in_(ids), PaymentArchive.payment_id.is_(None))
+            }
+            rows = [r for r in rows if r[0] in live]
+            db.add_all([
+                PaymentArchive(
+                    payment_id=payment_id,
+                    raw_ocr_text=compress_text(raw_ocr_text),
+                    screenshot_bundle=bundle_name if screenshot_path in bundled else None,
+                )
+                for payment_id, _, screenshot_path, raw_ocr_text in rows
+            ])
+            # List responses no longer carry the raw OCR text
+            bump_payments_version(db, [r[1] for r in rows])
+            db.commit()
+        except Exception:
+            db.rollback()
+            if bundled:
+                os.remove(bundle_path)
+            raise
+    finally:
+        db.close()
+
+    # Only remove uploads whose archive row was committed; members of payments
+    # deleted meanwhile stay behind in the bundle until compact_archive_bundles
+    archived_files = {r[2] for r in rows} & bundled
+    for screenshot_path in archived_files:
+        try:
+            os.remove(os.path.join(UPLOAD_DIR, screenshot_path))
+        except FileNotFoundError:
+            pass
+    logger.info(f"Archived {len(rows)} payment(s), {len(archived_files)} screenshot(s) into {bundle_name if bundled else 'no bundle'}")
+    return len(rows)
+
+
+def compact_archive_bundles() -> int:
+    """Drop archived data that no payment references any more.
+
+    Removes ``payment_archives`` rows whose payment is gone (SQLite doesn't
+    enforce the foreign key here), rewrites bundles without their unreferenced
+    members and deletes bundles that end up empty, plus stale ``.tmp`` files.
+    Skips the pass if another process holds ``archive_lock``. Returns the
+    number of bundle members removed.
+    """
+    with archive_lock() as acquired:
+        if not acquired:
+            return 0
+
+        db = SessionLocal()
+        try:
+            orphans = (
+                db.query(PaymentArchive)
+                .filter(~PaymentArchive.payment_id.in_(db.query(Payment.id)))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            referenced = {}
+            for bundle_name, screenshot_path in (
+                db.query(PaymentArchive.screenshot_bundle, Payment.screenshot_path)
+                .join(Payment, Payment.id == PaymentArchive.payment_id)
+                .filter(PaymentArchive.screenshot_bundle.isnot(None))
+            ):
+                referenced.setdefault(bundle_name, set()).add(screenshot_path)
+        finally:
+            db.close()
+
+        removed = 0
+        for entry in os.scandir(ARCHIVE_DIR):
+            if entry.name.endswith(".tmp"):
+                # Only a crashed archiver leaves these; we hold the lock
+                os.remove(entry.path)
+                continue
+            if not entry.name.endswith(".zip"):
+                continue
+            keep = referenced.get(entry.name, set())
+            with zipfile.ZipFile(entry.path) as bundle:
+                members = bundle.namelist()
+                stale = [m for m in members if m not in keep]
+                if not stale:
+                    continue
+                if len(stale) < len(members):
+                    tmp_path = entry.path + ".tmp"
+                    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as out:
+                        for info in bundle.infolist():
+                            if info.filename in keep:
+                                out.writestr(info, bundle.read(info))
+            # Same name, so payment_archives rows stay valid; readers holding
+            # the old file open keep reading it until they close it
+            if len(stale) < len(members):
+                os.replace(tmp_path, entry.path)
+            else:
+                os.remove(entry.path)
+            removed += len(stale)
+
+    if orphans or removed:
+        logger.info(f"Archive compaction dropped {orphans} orphaned row(s) and {removed} bundle member(s)")
+    return removed
+
+
+def run_retention():
+    """Archive old payments batch by batch until none are left.
+
+    Returns immediately if another process is already archiving.
+    """
+    total = 0
+    with archive_lock() as acquired:
+        if not acquired:
+            logger.info("Retention skipped: another process holds the archive lock")
+            return 0
+        while not _stop_event.is_set():
+            archived = archive_old_payments()
+            total += archived
+            if archived < RETENTION_BATCH_SIZE:
+                break
+        if total:
+            release_free_pages()
+    return total
+
+
+def release_free_pages():
+    """Return pages freed by archiving to the OS so the SQLite file shrinks.
+
+    Needs ``auto_vacuum = INCREMENTAL`` (migration 5); otherwise a no-op.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        freed = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        # The pragma frees one page per step and sqlite3's execute() steps only
+        # once for statements without rows; executescript() runs it to completion
+        conn.connection.dbapi_connection.executescript("PRAGMA incremental_vacuum;")
+    if freed:
+        logger.info(f"Released {freed} free database page(s)")
+
+
+def _run(interval: int):
+    while not _stop_event.wait(interval):
+        try:
+            run_retention()
+        except Exception as e:
+            logger.error(f"Retention job failed: {e}")
+
+
+def start_retention(interval: int = RETENTION_INTERVAL_SECONDS):
+    """Start the background retention thread (no-op if disabled or already running)."""
+    global _thread
+    if interval <= 0:
+        return
+    if _thread is not None and _thread.is_alive():
+        return
+    _stop_event.clear()
+    _thread = threading.Thread(target=_run, args=(interval,), name="retention", daemon=True)
+    _thread.start()
+
+
+def stop_retention():
+    """Signal the background retention thread to exit."""
+    _stop_event.set()
@@ -1,20 +1,102 @@
 import os
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Header, Response
+from sqlalchemy import insert
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional
 from database import get_db
-from models import Payment, User, Sport
-from schemas import PaymentResponse, PaymentUpdate
+from models import Payment, PaymentArchive, PendingScreenshotDeletion, User, Sport
+from schemas import (
+    PaymentResponse,
+    PaymentUpdate,
+    PaymentBulkSelection,
+    PaymentBulkUpdate,
+    BulkResultResponse,
+    MAX_BULK_IDS,
+)
 from auth import get_current_user
-from ocr_service import extract_payment_details
-from config import UPLOAD_DIR
+from retention_service import load_archived_ocr_text
+from cache_service import (
+    bump_payments_version,
+    payments_etag,
+    is_not_modified,
+    not_modified_response,
+    validator_headers,
+)
+from config import UPLOAD_DIR, OCR_BACKEND, PROFILING_ENABLED
+
+if OCR_BACKEND == "fake":
+    from fake_ocr import extract_payment_details
+else:
+    from ocr_service import extract_payment_details
+
+if PROFILING_ENABLED:
+    from profiling_service import timed
+    extract_payment_details = timed("ocr")(extract_payment_details)
 
 router = APIRouter(prefix="/api/payments", tags=["Payments"])
 
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"}
 
 
+def _apply_filters(query, sport_id: Optional[int], status: Optional[str], search: Optional[str]):
+    """Apply the dashboard's sport/status/search filters to a Payment query."""
+    if sport_id is not None:
+        query = query.filter(Payment.sport_id == sport_id)
+    if status:
+        query = query.filter(Payment.status.ilike(f"%{status}%"))
+    if search:
+        query = query.filter(
+            (Payment.transaction_id.ilike(f"%{search}%"))
+            | (Payment.sender_name.ilike(f"%{search}%"))
+            | (Payment.receiver_name.ilike(f"%{search}%"))
+            | (Payment.upi_id.ilike(f"%{search}%"))
+        )
+    return query
+
+
+def _bulk_query(selection: PaymentBulkSelection, user: User, db: Session):
+    """Build a set-based query for the payments selected by ids and/or filter."""
+    f = selection.filter
+    # Mirror _apply_filters: empty status/search strings don't narrow the selection
+    has_filter = f is not None and (f.sport_id is not None or bool(f.status) or bool(f.search))
+    if not selection.ids and not has_filter and not selection.all:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide 'ids', a non-empty 'filter', or 'all': true to select payments",
+        )
+    ids = set(selection.ids or ())
+    if len(ids) > MAX_BULK_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BULK_IDS} ids per request; use a 'filter' for larger selections",
+        )
+
+    query = db.query(Payment).filter(Payment.user_id == user.id)
+    if ids:
+        query = query.filter(Payment.id.in_(ids))
+    if has_filter:
+        query = _apply_filters(query, f.sport_id, f.status, f.search)
+    return query
+
+
+def _delete_payments(query, db: Session) -> int:
+    """Delete the payments selected by ``query`` and queue their screenshots.
+
+    The file names go to ``pending_screenshot_deletions`` in the caller's
+    transaction; the background reaper removes the files after commit.
+    """
+    db.execute(
+        insert(PendingScreenshotDeletion).from_select(
+            ["screenshot_path"], query.with_entities(Payment.screenshot_path)
+        )
+    )
+    db.query(PaymentArchive).filter(
+        PaymentArchive.payment_id.in_(query.with_entities(Payment.id))
+    ).delete(synchronize_session=False)
+    return query.delete(synchronize_session=False)
+
+
 @router.post("/upload", response_model=PaymentResponse, status_code=201)
 async def upload_payment(
     file: UploadFile = File(...),
@@ -43,26 +125,32 @@ async def upload_payment(
     with open(filepath, "wb") as f:
         f.write(content)
 
-    # Run OCR
-    ocr_result = extract_payment_details(filepath)
-    extracted = ocr_result.get("extracted", {})
-
-    # Create payment record
-    payment = Payment(
-        user_id=current_user.id,
-        sport_id=sport_id,
-        transaction_id=extracted.get("transaction_id"),
-        amount=extracted.get("amount"),
-        sender_name=extracted.get("sender_name"),
-        receiver_name=extracted.get("receiver_name"),
-        date=extracted.get("date"),
-        status=extracted.get("status", "Completed"),
-        upi_id=extracted.get("upi_id"),
-        screenshot_path=filename,
-        raw_ocr_text=ocr_result.get("raw_text", ""),
-    )
-    db.add(payment)
-    db.commit()
+    try:
+        # Run OCR
+        ocr_result = extract_payment_details(filepath)
+        extracted = ocr_result.get("extracted", {})
+
+        # Create payment record
+        payment = Payment(
+            user_id=current_user.id,
+            sport_id=sport_id,
+            transaction_id=extracted.get("transaction_id"),
+            amount=extracted.get("amount"),
+            sender_name=extracted.get("sender_name"),
+            receiver_name=extracted.get("receiver_name"),
+            date=extracted.get("date"),
+            status=extracted.get("status", "Completed"),
+            upi_id=extracted.get("upi_id"),
+            screenshot_path=filename,
+            raw_ocr_text=ocr_result.get("raw_text", ""),
+        )
+        db.add(payment)
+        bump_payments_version(db, [current_user.id])
+        db.commit()
+    except Exception:
+        # The payment was never saved, so nothing will queue this file for deletion
+        os.remove(filepath)
+        raise
     db.refresh(payment)
 
     # Eagerly load sport relationship
@@ -74,41 +162,100 @@ async def upload_payment(
 
 @router.get("", response_model=list[PaymentResponse])
 def list_payments(
+    response: Response,
     sport_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """List all payments for the current user with optional filters."""
+    """List all payments for the current user with optional filters.
+
+    Supports conditional GETs against the user's payments version.
+    """
+    etag = payments_etag(current_user, "list", sport_id, status, search)
+    last_modified = current_user.payments_updated_at
+    if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+        return not_modified_response(etag, last_modified)
+    response.headers.update(validator_headers(etag, last_modified))
+
     query = (
         db.query(Payment)
         .options(joinedload(Payment.sport))
         .filter(Payment.user_id == current_user.id)
     )
-    if sport_id is not None:
-        query = query.filter(Payment.sport_id == sport_id)
-    if status:
-        query = query.filter(Payment.status.ilike(f"%{status}%"))
-    if search:
-        query = query.filter(
-            (Payment.transaction_id.ilike(f"%{search}%"))
-            | (Payment.sender_name.ilike(f"%{search}%"))
-            | (Payment.receiver_name.ilike(f"%{search}%"))
-            | (Payment.upi_id.ilike(f"%{search}%"))
-        )
+    query = _apply_filters(query, sport_id, status, search)
 
     payments = query.order_by(Payment.created_at.desc()).all()
     return payments
 
 
+@router.post("/bulk-update", response_model=BulkResultResponse)
+def bulk_update_payments(
+    data: PaymentBulkUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Reassign sport and/or set status on many payments in one statement."""
+    values = {}
+    if "sport_id" in data.model_fields_set:
+        if data.sport_id is not None and not db.query(Sport.id).filter(Sport.id == data.sport_id).first():
+            raise HTTPException(status_code=404, detail="Sport category not found")
+        values[Payment.sport_id] = data.sport_id
+    if data.status is not None:
+        values[Payment.status] = data.status
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to update: set 'sport_id' and/or 'status'")
+
+    affected = _bulk_query(data, current_user, db).update(values, synchronize_session=False)
+    if affected:
+        bump_payments_version(db, [current_user.id])
+    db.commit()
+    return BulkResultResponse(affected=affected)
+
+
+@router.post("/bulk-delete", response_model=BulkResultResponse)
+def bulk_delete_payments(
+    data: PaymentBulkSelection,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Delete many payments in one statement.
+
+    Screenshot files are left for the background reaper to remove.
+    """
+    affected = _delete_payments(_bulk_query(data, current_user, db), db)
+    if affected:
+        bump_payments_version(db, [current_user.id])
+    db.commit()
+    return BulkResultResponse(affected=affected)
+
+
 @router.get("/{payment_id}", response_model=PaymentResponse)
 def get_payment(
     payment_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Get a single payment by ID."""
+    """Get a single payment by ID (conditional GETs supported)."""
+    etag = payments_etag(current_user, "detail", payment_id)
+    last_modified = current_user.payments_updated_at
+    if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+        # Only a payment that exists and is the user's can be "not modified"
+        exists = (
+            db.query(Payment.id)
+            .filter(Payment.id == payment_id, Payment.user_id == current_user.id)
+            .first()
+        )
+        if not exists:
+            raise HTTPException(status_code=404, detail="Payment not found")
+        return not_modified_response(etag, last_modified)
+
     payment = (
         db.query(Payment)
         .options(joinedload(Payment.sport))
@@ -117,6 +264,13 @@ def get_payment(
     )
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
+    response.headers.update(validator_headers(etag, last_modified))
+
+    # Raw OCR text of archived payments lives compressed in the side table
+    if payment.raw_ocr_text is None:
+        archived_text = load_archived_ocr_text(db, payment.id)
+        if archived_text is not None:
+            return PaymentResponse.model_validate(payment).model_copy(update={"raw_ocr_text": archived_text})
     return payment
 
 
@@ -136,6 +290,7 @@ def update_payment(
     for key, value in update_data.items():
         setattr(payment, key, value)
 
+    bump_payments_version(db, [current_user.id])
     db.commit()
     db.refresh(payment)
     return payment
@@ -147,15 +302,12 @@ def delete_payment(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Delete a payment record."""
-    payment = db.query(Payment).filter(Payment.id == payment_id, Payment.user_id == current_user.id).first()
-    if not payment:
-        raise HTTPException(status_code=404, detail="Payment not found")
-
-    # Remove screenshot file
-    filepath = os.path.join(UPLOAD_DIR, payment.screenshot_path)
-    if os.path.exists(filepath):
-        os.remove(filepath)
+    """Delete a payment record.
 
-    db.delete(payment)
+    The screenshot file is left for the background reaper to remove.
+    """
+    query = db.query(Payment).filter(Payment.id == payment_id, Payment.user_id == current_user.id)
+    if not _delete_payments(query, db):
+        raise HTTPException(status_code=404, detail="Payment not found")
+    bump_payments_version(db, [current_user.id])
     db.commit()
@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
 from sqlalchemy.orm import Session
+from typing import Optional
 from database import get_db
-from models import Sport
+from models import Sport, Payment
 from schemas import SportCreate, SportResponse
+from cache_service import (
+    get_sports_json,
+    invalidate_sports,
+    is_not_modified,
+    not_modified_response,
+    validator_headers,
+    bump_payments_version,
+)
 
 router = APIRouter(prefix="/api/sports", tags=["Sports"])
 
 
 @router.get("", response_model=list[SportResponse])
-def list_sports(db: Session = Depends(get_db)):
-    """List all sports categories."""
-    return db.query(Sport).order_by(Sport.name).all()
+def list_sports(
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """List all sports categories (served from an in-process cache)."""
+    etag, body = get_sports_json(db)
+    if is_not_modified(etag, None, if_none_match, None):
+        return not_modified_response(etag)
+    return Response(content=body, media_type="application/json", headers=validator_headers(etag))
 
 
 @router.post("", response_model=SportResponse, status_code=201)
@@ -23,6 +38,7 @@ def create_sport(data: SportCreate, db: Session = Depends(get_db)):
     sport = Sport(name=data.name, icon=data.icon, description=data.description)
     db.add(sport)
     db.commit()
+    invalidate_sports()
     db.refresh(sport)
     return sport
 
@@ -33,5 +49,11 @@ def delete_sport(sport_id: int, db: Session = Depends(get_db)):
     sport = db.query(Sport).filter(Sport.id == sport_id).first()
     if not sport:
         raise HTTPException(status_code=404, detail="Sport not found")
+    # Payments that referenced this sport render differently now
+    affected_users = [
+        uid for (uid,) in db.query(Payment.user_id).filter(Payment.sport_id == sport_id).distinct()
+    ]
+    bump_payments_version(db, affected_users)
     db.delete(sport)
     db.commit()
+    invalidate_sports()
@@ -88,3 +88,27 @@ class OCRResultResponse(BaseModel):
     raw_text: str
     extracted: dict
     message: str
+
+
+class PaymentFilter(BaseModel):
+    sport_id: Optional[int] = None
+    status: Optional[str] = None
+    search: Optional[str] = None
+
+
+MAX_BULK_IDS = 1000
+
+
+class PaymentBulkSelection(BaseModel):
+    ids: Optional[list[int]] = Field(None, description=f"At most {MAX_BULK_IDS} distinct payment ids")
+    filter: Optional[PaymentFilter] = None
+    all: bool = False  # must be set explicitly to target every payment of the user
+
+
+class PaymentBulkUpdate(PaymentBulkSelection):
+    sport_id: Optional[int] = None
+    status: Optional[str] = None
+
+
+class BulkResultResponse(BaseModel):
+    affected: int
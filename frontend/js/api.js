@@ -133,6 +133,28 @@ class Api {
         if (!res.ok) throw new Error('Delete failed');
     }
 
+    static async bulkUpdatePayments(selection, changes) {
+        const res = await fetch(`${API_BASE}/payments/bulk-update`, {
+            method: 'POST',
+            headers: { ...this.authHeaders(), 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ...selection, ...changes }),
+        });
+        const result = await res.json();
+        if (!res.ok) throw new Error(result.detail || 'Bulk update failed');
+        return result;
+    }
+
+    static async bulkDeletePayments(selection) {
+        const res = await fetch(`${API_BASE}/payments/bulk-delete`, {
+            method: 'POST',
+            headers: { ...this.authHeaders(), 'Content-Type': 'application/json' },
+            body: JSON.stringify(selection),
+        });
+        const result = await res.json();
+        if (!res.ok) throw new Error(result.detail || 'Bulk delete failed');
+        return result;
+    }
+
     // ── Sports ───────────────────────────────────────────────
 
     static async getSports() {